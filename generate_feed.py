@@ -2,156 +2,507 @@
 """
 Hardened feed generator:
  - Reads YAML configs from FEEDS_DIR
- - Scrapes each site according to selectors
- - Writes one RSS/Atom XML per site into OUTPUT_DIR
+ - Fetches all sites concurrently (asyncio + aiohttp)
+ - Scrapes each site according to selectors (bs4, or selectolax's
+   lexbor backend for sites with `parser: lexbor`), one worker process
+   per site up to the CPU count
+ - Streams one RSS 2.0 XML per site into OUTPUT_DIR
  - Robust to missing/empty YAML keys and broken selectors
 """
 import os
 import re
+import asyncio
+import codecs
+import ssl
+import pickle
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
-from urllib.parse import urljoin
+from email.utils import format_datetime
+from urllib.parse import urljoin, urlsplit
+from xml.sax.saxutils import escape
 
 import yaml
-import requests
-from bs4 import BeautifulSoup
-from feedgen.feed import FeedGenerator
+import aiohttp
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.dammit import EncodingDetector
+
+try:
+    from selectolax.lexbor import LexborHTMLParser, LexborNode
+except ImportError:  # optional fast parser
+    LexborHTMLParser = LexborNode = None
 
 FEEDS_DIR = "feeds"
 OUTPUT_DIR = "docs"
+FETCH_TIMEOUT = 20
+FETCH_RETRIES = 3
+FETCH_BACKOFF = 0.3
+HTTP_HEADERS = {
+    "Accept-Encoding": "gzip, deflate",
+    "User-Agent": "myrssfeeds/1.0",
+}
+CFG_CACHE_PATH = os.path.join(OUTPUT_DIR, ".cfg_cache.pkl")
+SELECTOR_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "myrssfeeds", "selectors.pkl")
+# libyaml's C loader when available, else the pure-Python one
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_SLUG_RE = re.compile(r"[^\w\-\.]+")
+_SKIP_HREF_RE = re.compile(r"^(javascript:|mailto:|#)")
+# a single compound selector: optional tag, then .class / #id parts
+_SIMPLE_SELECTOR_RE = re.compile(r"^([a-zA-Z][\w-]*)?((?:[.#][\w-]+)*)$")
+_SELECTOR_PART_RE = re.compile(r"[.#][\w-]+")
+# C0 control characters that are not allowed anywhere in an XML document
+_XML_ILLEGAL_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_LAST_BUILD_RE = re.compile(rb"<lastBuildDate>([^<]*)</lastBuildDate>")
+FIELD_NAMES = ("title", "subtitle", "description", "link", "picture")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+def _norm_str(value):
+    """Stripped string, or None for missing/blank/non-string YAML values."""
+    if not isinstance(value, str):
+        return None
+    return value.strip() or None
+
 def safe_slug(text):
     if not text:
         return "site"
-    s = re.sub(r"[^\w\-\.]+", "_", text.strip())
-    return s[:120] or "site"
+    return _SLUG_RE.sub("_", text.strip())[:120] or "site"
+
+def load_cfg_cache(path=CFG_CACHE_PATH):
+    try:
+        with open(path, "rb") as fh:
+            cache = pickle.load(fh)
+        return cache if isinstance(cache, dict) else {}
+    except Exception:
+        return {}
 
-def fetch_html(url, timeout=20):
+def save_cfg_cache(cache, path=CFG_CACHE_PATH):
+    try:
+        with open(path, "wb") as fh:
+            pickle.dump(cache, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        print(f"  [cache error] Could not write {path}: {e}")
+
+def load_cfg(path, cache):
+    """Parse a YAML config, reusing `cache` while its (mtime, size) is unchanged."""
+    st = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size)
+    hit = cache.get(path)
+    if hit is not None and hit[0] == key:
+        return hit[1]
+    with open(path, "r", encoding="utf-8") as fh:
+        cfg = yaml.load(fh, Loader=_YAML_LOADER) or {}
+    cache[path] = (key, cfg)
+    return cfg
+
+def decode_html(body, charset=None):
+    """
+    Decode a response body leniently: the HTTP charset, else the page's
+    <meta> charset, else UTF-8 falling back to ISO-8859-1. Undecodable
+    bytes become U+FFFD instead of dropping the whole site.
+    """
+    for enc in (charset, EncodingDetector.find_declared_encoding(body, is_html=True)):
+        if not enc:
+            continue
+        try:
+            codecs.lookup(enc)
+        except LookupError:
+            continue
+        return body.decode(enc, errors="replace")
     try:
-        r = requests.get(url, timeout=timeout)
+        return body.decode("utf-8")
+    except UnicodeDecodeError:
+        # what requests did for undeclared text/* bodies; never fails
+        return body.decode("iso-8859-1")
+
+async def _get_text(session, url):
+    async with session.get(url) as r:
         r.raise_for_status()
-        return r.text
+        return decode_html(await r.read(), r.charset)
+
+def _is_retryable(exc):
+    # connection drops and server-side errors are worth another try;
+    # timeouts and 4xx are not
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status >= 500 or exc.status == 429
+    return isinstance(exc, aiohttp.ClientConnectionError)
+
+async def fetch_html_async(session, url, timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES):
+    if not url:
+        return None
+    for attempt in range(retries + 1):
+        try:
+            return await asyncio.wait_for(_get_text(session, url), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"  [fetch error] {url}: timed out after {timeout}s")
+            return None
+        except Exception as e:
+            if attempt < retries and _is_retryable(e):
+                await asyncio.sleep(FETCH_BACKOFF * 2 ** attempt)
+                continue
+            print(f"  [fetch error] {url}: {e}")
+            return None
+
+async def gather_all(jobs, timeout=FETCH_TIMEOUT):
+    # one keep-alive session for all sites (a single TLS context, pooled
+    # connections reused across configs on the same host); fetches run
+    # concurrently, capped per host
+    connector = aiohttp.TCPConnector(
+        ssl=ssl.create_default_context(), limit=64, limit_per_host=4,
+    )
+    async with aiohttp.ClientSession(connector=connector, headers=HTTP_HEADERS) as session:
+        return await asyncio.gather(*[
+            fetch_html_async(session, _norm_str(cfg.get("url")), timeout)
+            for cfg, _ in jobs
+        ])
+
+# Small node helpers so the scraping code works on both bs4 Tags and
+# selectolax LexborNodes.
+def _is_lexbor(el):
+    return LexborNode is not None and isinstance(el, LexborNode)
+
+# selector string -> compiled SoupSieve; shared across sites so identical
+# selectors in different YAMLs compile once, and persisted between runs
+_SELECTOR_CACHE = {}
+
+def _compile_selector(sel):
+    m = _SELECTOR_CACHE.get(sel)
+    if m is None:
+        m = _SELECTOR_CACHE[sel] = soupsieve.compile(sel)
+    return m
+
+def load_selector_cache(path=SELECTOR_CACHE_PATH):
+    try:
+        with open(path, "rb") as fh:
+            data = pickle.load(fh)
+    except Exception:
+        return
+    # compiled matchers are only valid for the soupsieve that built them
+    if isinstance(data, dict) and data.get("soupsieve") == soupsieve.__version__:
+        _SELECTOR_CACHE.update(data.get("selectors") or {})
+
+def save_selector_cache(selectors, path=SELECTOR_CACHE_PATH):
+    data = {
+        "soupsieve": soupsieve.__version__,
+        "selectors": {sel: _SELECTOR_CACHE[sel] for sel in selectors if sel in _SELECTOR_CACHE},
+    }
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_atomic(path, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
     except Exception as e:
-        print(f"  [fetch error] {url}: {e}")
+        print(f"  [cache error] Could not write {path}: {e}")
+
+def warm_selector_cache(cfgs):
+    """
+    Compile every bs4 selector the configs use, before the parse workers
+    start (forked workers inherit the cache). Returns the selectors in use and
+    whether the cache needs saving.
+    """
+    used, missed = set(), False
+    for cfg in cfgs:
+        if (_norm_str(cfg.get("parser")) or "bs4").lower() == "lexbor":
+            continue
+        fields = cfg.get("fields")
+        sels = [cfg.get("item_selector")]
+        if isinstance(fields, dict):
+            sels += [fields.get(name) for name in FIELD_NAMES]
+        for sel in map(_norm_str, sels):
+            if sel is None or sel in used:
+                continue
+            cached = sel in _SELECTOR_CACHE
+            try:
+                _compile_selector(sel)
+            except Exception:
+                continue  # never cached; reported per site while parsing
+            missed = missed or not cached
+            used.add(sel)
+    return used, missed or len(used) != len(_SELECTOR_CACHE)
+
+def strainer_from_selector(sel):
+    """
+    Build a SoupStrainer that keeps (a superset of) the elements matched by a
+    simple selector like `li.teaser.teaser-horizontal` or `div#main`.
+    Returns None when the selector can't be reduced safely (combinators,
+    attribute selectors, pseudo-classes, selector lists...).
+
+    Only used for sites that set `strain: true`: without the ancestors in
+    the tree, an item whose end tag is omitted (`</li>`, `</tr>`, `</p>`...)
+    is no longer closed by its parent's end tag and swallows the rest of
+    the page. Enable it only for pages that close their items explicitly.
+    """
+    m = _SIMPLE_SELECTOR_RE.match(sel or "")
+    if not m or not sel:
         return None
+    tag, rest = m.group(1), m.group(2)
+    attrs = {}
+    for part in _SELECTOR_PART_RE.findall(rest):
+        if part[0] == "#":
+            attrs.setdefault("id", part[1:])
+        else:
+            # the strainer sees the raw class string while parsing, so match a
+            # whitespace-separated token; one class is enough to prune the
+            # tree, select() does the exact match afterwards
+            attrs.setdefault("class", re.compile(r"(?:^|\s)%s(?:\s|$)" % re.escape(part[1:])))
+    return SoupStrainer(name=tag.lower() if tag else None, attrs=attrs)
+
+def _compile_fields(fields, parser):
+    """Map field name -> selector, compiled for bs4 or kept as str for lexbor."""
+    compiled = {}
+    for name in FIELD_NAMES:
+        sel = _norm_str(fields.get(name))
+        if sel is None:
+            continue
+        if parser == "lexbor":
+            compiled[name] = sel
+            continue
+        try:
+            compiled[name] = _compile_selector(sel)
+        except Exception as e:
+            print(f"  [selector error] field '{name}' selector '{sel}': {e}")
+    return compiled
+
+def _select_one(elem, sel):
+    # sel is a plain string for lexbor, a compiled SoupSieve for bs4
+    if not _is_lexbor(elem):
+        return sel.select_one(elem)
+    # lexbor's css() also matches elem itself; soupsieve only looks at
+    # descendants, so skip the item node to get the same answer
+    # (compare mem_id: LexborNode == serialises both subtrees)
+    el = elem.css_first(sel)
+    if el is None or el.mem_id != elem.mem_id:
+        return el
+    return next((n for n in elem.css(sel) if n.mem_id != elem.mem_id), None)
+
+def _first_a_and_img(elem, need_a=True, need_img=True):
+    """First <a> and first <img> under elem, found in a single walk."""
+    first_a = first_img = None
+    if _is_lexbor(elem):
+        # one C-side query beats a Python-level traverse(); css() also
+        # matches elem itself, which bs4's .descendants never yields
+        # (compare mem_id: LexborNode == serialises both subtrees)
+        elem_id = elem.mem_id
+        for node in elem.css("a, img"):
+            if node.mem_id == elem_id:
+                continue
+            if node.tag == "a":
+                first_a = first_a or node
+            else:
+                first_img = first_img or node
+            if (first_a or not need_a) and (first_img or not need_img):
+                break
+        return first_a, first_img
+    for child in elem.descendants:
+        name = getattr(child, "name", None)
+        if name == "a" and first_a is None:
+            first_a = child
+        elif name == "img" and first_img is None:
+            first_img = child
+        else:
+            continue
+        if (first_a is not None or not need_a) and (first_img is not None or not need_img):
+            break
+    return first_a, first_img
+
+def _node_text(el):
+    if _is_lexbor(el):
+        return el.text(separator=" ", strip=True)
+    return el.get_text(" ", strip=True)
+
+def _node_attr(el, name):
+    if _is_lexbor(el):
+        return el.attributes.get(name)
+    return el.get(name)
 
 def pick_image_src(element):
+    if not element:
+        return ""
     # Try common attributes for images
     for attr in ("src", "data-src", "data-original", "data-lazy"):
-        val = element.get(attr) if element else None
+        val = _node_attr(element, attr)
         if val:
             return val
     # fallback to srcset first candidate if present
-    if element and element.has_attr("srcset"):
-        ss = element["srcset"].split(",")[0].strip().split(" ")[0]
+    srcset = _node_attr(element, "srcset")
+    if srcset:
+        ss = srcset.split(",")[0].strip().split(" ")[0]
         if ss:
             return ss
     return ""
 
-def normalize_href(href, base, prefix):
+def _fast_join(base, base_parts, href):
+    """
+    urljoin(base, href) for a base already split with urlsplit. Absolute,
+    protocol-relative and root-relative hrefs are joined by string concat;
+    anything else (relative paths, dot segments, hrefs with an empty host)
+    goes through urljoin.
+    """
+    if "/." not in href and base_parts.scheme and base_parts.netloc:
+        if href.startswith(("http://", "https://")):
+            if _has_host(href, href.index("//") + 2):
+                return href
+        elif href.startswith("//"):
+            if _has_host(href, 2):
+                return f"{base_parts.scheme}:{href}"
+        elif href.startswith("/"):
+            return f"{base_parts.scheme}://{base_parts.netloc}{href}"
+    return urljoin(base, href)
+
+def _has_host(href, start):
+    # a non-empty authority follows the "//" at href[start - 2:start]
+    return len(href) > start and href[start] not in "/?#"
+
+def normalize_href(href, base, base_parts):
     if not href:
         return ""
     href = href.strip()
     # ignore javascript and fragments-only
-    if href.startswith("javascript:") or href.startswith("mailto:") or href.startswith("#"):
+    if _SKIP_HREF_RE.match(href):
         return ""
     # join relative links
-    base_for_join = prefix or base
     try:
-        return urljoin(base_for_join, href)
+        return _fast_join(base, base_parts, href)
+    except Exception:
+        return ""
+
+# Per-item field extractors. `sel` is a prepared selector from
+# _compile_fields, or None when the field isn't configured.
+def _safe_text(elem, sel):
+    if sel is None:
+        return ""
+    try:
+        el = _select_one(elem, sel)
+    except Exception:
+        return ""
+    return _node_text(el) if el else ""
+
+def _safe_link(elem, sel):
+    # raw href of the configured link element; fallbacks happen in the caller
+    if sel is None:
+        return ""
+    try:
+        el = _select_one(elem, sel)
+    except Exception:
+        return ""
+    return (_node_attr(el, "href") or "") if el else ""
+
+def _safe_image(elem, sel):
+    # raw image src of the configured picture element
+    if sel is None:
+        return ""
+    try:
+        el = _select_one(elem, sel)
     except Exception:
         return ""
+    return pick_image_src(el) if el else ""
 
-def scrape_site_from_cfg(cfg, fname_for_fallback):
-    # defensively read config values
-    site_name = (cfg.get("site_name") or "").strip() or safe_slug(fname_for_fallback)
-    url = (cfg.get("url") or "").strip()
+def _lap(timings, stage, t0):
+    """Add the time since t0 to timings[stage] (if collecting); return now."""
+    t1 = time.perf_counter()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + (t1 - t0)
+    return t1
+
+def print_timings(timings):
+    print("Timings (parse/items summed over sites, the rest wall-clock):")
+    for stage, secs in timings.items():
+        print(f"  {stage:<12}{secs:9.3f}s")
+
+def parse_site_from_html(html, cfg, fname_for_fallback, timings=None):
+    # defensively read config values: normalized once, everything below
+    # assumes clean values
+    site_name = _norm_str(cfg.get("site_name")) or safe_slug(fname_for_fallback)
+    url = _norm_str(cfg.get("url"))
     if not url:
         print(f"Skipping {site_name}: no 'url' defined in config.")
         return site_name, []
 
-    item_selector = (cfg.get("item_selector") or "").strip()
+    item_selector = _norm_str(cfg.get("item_selector"))
     if not item_selector:
         print(f"Skipping {site_name}: no 'item_selector' defined in config.")
         return site_name, []
 
-    fields = cfg.get("fields") or {}
-    link_prefix = (cfg.get("link_prefix") or "").strip() or None
+    fields = cfg.get("fields")
+    if not isinstance(fields, dict):
+        fields = {}
+    link_prefix = _norm_str(cfg.get("link_prefix"))
+    parser = (_norm_str(cfg.get("parser")) or "bs4").lower()
+    strain = cfg.get("strain") is True
 
-    html = fetch_html(url)
     if not html:
         return site_name, []
 
-    soup = BeautifulSoup(html, "html.parser")
+    if parser == "lexbor" and LexborHTMLParser is None:
+        print(f"  [parser] selectolax not installed; using bs4 for {site_name}")
+        parser = "bs4"
+
     elements = []
+    t0 = time.perf_counter()
     try:
-        elements = soup.select(item_selector)
+        if parser == "lexbor":
+            tree = LexborHTMLParser(html)
+            t0 = _lap(timings, "parse", t0)
+            elements = tree.css(item_selector)
+        else:
+            strainer = strainer_from_selector(item_selector) if strain else None
+            soup = BeautifulSoup(html, "html.parser", parse_only=strainer)
+            t0 = _lap(timings, "parse", t0)
+            elements = _compile_selector(item_selector).select(soup)
     except Exception as e:
         print(f"  [selector error] item_selector '{item_selector}' failed for {site_name}: {e}")
         return site_name, []
 
+    compiled = _compile_fields(fields, parser)
+    # relative links are joined against link_prefix (or the page url);
+    # split it once instead of inside urljoin for every item
+    join_base = link_prefix or url
+    try:
+        join_parts = urlsplit(join_base)
+    except ValueError as e:
+        # e.g. "https://[bad"; _fast_join then always defers to urljoin,
+        # which fails per link and falls back to the page url
+        print(f"  [url error] site={site_name} base '{join_base}': {e}")
+        join_parts = urlsplit("")
+    sel_title = compiled.get("title")
+    sel_subtitle = compiled.get("subtitle")
+    sel_description = compiled.get("description")
+    sel_link = compiled.get("link")
+    sel_picture = compiled.get("picture")
+    # text-only feeds skip the whole image path unless asked for it
+    want_picture = sel_picture is not None or bool(cfg.get("always_extract_image", False))
+    # prefixes are used verbatim (trailing spaces are intentional)
+    subtitle_is = str(fields.get("subtitle_is") or "")
+    description_is = str(fields.get("description_is") or "")
+
     entries = []
     for i, elem in enumerate(elements):
         try:
-            # helper to safely extract text by selector
-            def safe_text(sel):
-                if not sel or not isinstance(sel, str) or not sel.strip():
-                    return ""
-                try:
-                    el = elem.select_one(sel.strip())
-                except Exception:
-                    return ""
-                return el.get_text(" ", strip=True) if el else ""
-
-            # helper to safely extract link by selector (or fallback to first <a>)
-            def safe_link(sel):
-                href = ""
-                if sel and isinstance(sel, str) and sel.strip():
-                    try:
-                        el = elem.select_one(sel.strip())
-                    except Exception:
-                        el = None
-                    if el:
-                        href = el.get("href") or ""
-                # fallback: first <a> in element
-                if not href:
-                    a = elem.find("a")
-                    if a:
-                        href = a.get("href") or ""
-                # finally normalize
-                return normalize_href(href, url, link_prefix)
-
-            # helper to find images
-            def safe_image(sel):
-                img_src = ""
-                if sel and isinstance(sel, str) and sel.strip():
-                    try:
-                        el = elem.select_one(sel.strip())
-                    except Exception:
-                        el = None
-                    if el:
-                        img_src = pick_image_src(el) or ""
-                if not img_src:
-                    img = elem.find("img")
-                    if img:
-                        img_src = pick_image_src(img) or ""
-                if not img_src:
-                    return ""
-                return urljoin(link_prefix or url, img_src)
+            # minimum requirement: title present; skip items with no title
+            # (too noisy) before extracting anything else
+            title = _safe_text(elem, sel_title)
+            if not title:
+                continue
+
+            href = _safe_link(elem, sel_link)
+            img_src = _safe_image(elem, sel_picture) if want_picture else ""
+            if not href or (want_picture and not img_src):
+                # fallback: first <a> / first <img> in element, one walk for both
+                first_a, first_img = _first_a_and_img(
+                    elem, need_a=not href, need_img=want_picture and not img_src,
+                )
+                if not href and first_a is not None:
+                    href = _node_attr(first_a, "href") or ""
+                if want_picture and not img_src and first_img is not None:
+                    img_src = pick_image_src(first_img)
 
             item = {
-                "title": safe_text(fields.get("title", "")),
-                "subtitle": fields.get("subtitle_is", "") + safe_text(fields.get("subtitle", "")),
-                "description": fields.get("description_is", "") + safe_text(fields.get("description", "")),
-                "link": safe_link(fields.get("link", "")),
-                "picture": safe_image(fields.get("picture", "")),
+                "title": title,
+                "subtitle": (subtitle_is + _safe_text(elem, sel_subtitle)) if sel_subtitle is not None else subtitle_is,
+                "description": (description_is + _safe_text(elem, sel_description)) if sel_description is not None else description_is,
+                "link": normalize_href(href, join_base, join_parts),
+                "picture": _fast_join(join_base, join_parts, img_src) if img_src else "",
             }
 
-            # minimum requirement: title present
-            if not item["title"]:
-                # skip items with no title (too noisy)
-                continue
-
             # if link missing, fallback to the page url (better than nothing)
             if not item["link"]:
                 item["link"] = url
@@ -163,38 +514,101 @@ def scrape_site_from_cfg(cfg, fname_for_fallback):
             # continue to next item instead of aborting
             continue
 
-    # Keep the same approach as before: reverse so first-detected becomes first in feed
-    entries.reverse()
+    _lap(timings, "items", t0)
     return site_name, entries
 
-def build_and_write_feed(site_name, cfg, entries):
-    if not entries:
-        print(f"  No entries for {site_name}; skipping feed write.")
-        return
+def _parse_site_timed(html, cfg, fname_for_fallback):
+    # worker entry point: timings can't be shared across processes, so
+    # they travel back with the result; failures stay local to the site
+    timings = {}
+    try:
+        site_name, entries = parse_site_from_html(html, cfg, fname_for_fallback, timings)
+    except Exception as e:
+        # one broken site must not take the whole run down with it
+        site_name = (isinstance(cfg, dict) and _norm_str(cfg.get("site_name"))) or safe_slug(fname_for_fallback)
+        print(f"  [parse error] site={site_name}: {e}")
+        return site_name, [], {}
+    return site_name, entries, timings
 
-    fg = FeedGenerator()
-    fg.title(site_name)
-    fg.link(href=cfg.get("url", ""), rel="alternate")
-    fg.description(cfg.get("description", f"{site_name}"))
-    fg.language(cfg.get("language", "en"))
+def _xml_text(value):
+    return escape(_XML_ILLEGAL_RE.sub("", str(value)))
 
+def iter_rss(site_name, cfg, entries, pub_date):
+    """Yield the RSS 2.0 document for one site piece by piece."""
+    # same layout feedgen used to produce, so regenerated docs/ diff cleanly
+    yield "<?xml version='1.0' encoding='UTF-8'?>\n"
+    yield ('<rss xmlns:atom="http://www.w3.org/2005/Atom" '
+           'xmlns:content="http://purl.org/rss/1.0/modules/content/" version="2.0">')
+    yield "<channel>"
+    yield f"<title>{_xml_text(site_name)}</title>"
+    yield f"<link>{_xml_text(cfg.get('url') or '')}</link>"
+    yield f"<description>{_xml_text(cfg.get('description') or site_name)}</description>"
+    yield "<docs>http://www.rssboard.org/rss-specification</docs>"
+    yield "<generator>myrssfeeds</generator>"
+    yield f"<language>{_xml_text(cfg.get('language') or 'en')}</language>"
+    yield f"<lastBuildDate>{pub_date}</lastBuildDate>"
     for e in entries:
-        fe = fg.add_entry()
         title = e.get("title", "")
         if e.get("subtitle"):
             title = f"{title} – {e.get('subtitle')}"
-        fe.title(title)
-        fe.link(href=e.get("link", ""))
         desc = e.get("description", "") or ""
         if e.get("picture"):
             desc = f'<img src="{e.get("picture")}" alt="image" /><br/>{desc}'
-        fe.description(desc)
-        fe.pubDate(datetime.now(timezone.utc))
+        desc = _xml_text(desc)
+        yield "<item>"
+        yield f"<title>{_xml_text(title)}</title>"
+        yield f"<link>{_xml_text(e.get('link', ''))}</link>"
+        if desc:
+            yield f"<description>{desc}</description>"
+        yield f"<pubDate>{pub_date}</pubDate>"
+        yield "</item>"
+    yield "</channel></rss>"
+
+def render_feed(site_name, cfg, entries, pub_date):
+    return "".join(iter_rss(site_name, cfg, entries, pub_date)).encode("utf-8")
 
+def _is_unchanged(old, site_name, cfg, entries):
+    # the timestamps change on every run, so re-render with the previous
+    # file's date and compare: identical means no item changed
+    m = _LAST_BUILD_RE.search(old)
+    if not m:
+        return False
+    return render_feed(site_name, cfg, entries, m.group(1).decode("utf-8")) == old
+
+def write_atomic(path, data):
+    """Write `data` to a temp file next to `path`, then rename it into place."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+def build_and_write_feed(site_name, cfg, entries, pub_date=None):
+    if not entries:
+        print(f"  No entries for {site_name}; skipping feed write.")
+        return
+
+    if pub_date is None:
+        pub_date = format_datetime(datetime.now(timezone.utc))
     fname = safe_slug(site_name) + ".xml"
     out_path = os.path.join(OUTPUT_DIR, fname)
     try:
-        fg.rss_file(out_path)
+        with open(out_path, "rb") as fh:
+            old = fh.read()
+    except OSError:
+        old = None
+    try:
+        if old is not None and _is_unchanged(old, site_name, cfg, entries):
+            print(f"  Unchanged {out_path} ({len(entries)} items)")
+            return
+        write_atomic(out_path, render_feed(site_name, cfg, entries, pub_date))
         print(f"  Wrote {out_path} ({len(entries)} items)")
     except Exception as e:
         print(f"  [write error] Could not write {out_path}: {e}")
@@ -204,21 +618,57 @@ def main():
         print(f"Feeds directory '{FEEDS_DIR}' does not exist.")
         return
 
+    timings = {}
+    t0 = time.perf_counter()
+    jobs = []
+    old_cache = load_cfg_cache()
+    cfg_cache = {}
     files = sorted(os.listdir(FEEDS_DIR))
     for fname in files:
         if not fname.lower().endswith((".yml", ".yaml")):
             continue
         path = os.path.join(FEEDS_DIR, fname)
         try:
-            with open(path, "r", encoding="utf-8") as fh:
-                cfg = yaml.safe_load(fh) or {}
+            if path in old_cache:
+                cfg_cache[path] = old_cache[path]
+            cfg = load_cfg(path, cfg_cache)
         except Exception as e:
             print(f"Skipping {fname}: failed to parse YAML: {e}")
             continue
-        
-        # print('filename:', fname)
-        site_name, entries = scrape_site_from_cfg(cfg, os.path.splitext(fname)[0])
-        build_and_write_feed(site_name, cfg, entries)
+        if not isinstance(cfg, dict):
+            print(f"Skipping {fname}: config is not a mapping.")
+            continue
+        jobs.append((cfg, os.path.splitext(fname)[0]))
+    # only configs that still exist are kept
+    if cfg_cache != old_cache:
+        save_cfg_cache(cfg_cache)
+
+    if not jobs:
+        return
+
+    cfgs = [cfg for cfg, _ in jobs]
+    fnames = [fname for _, fname in jobs]
+    load_selector_cache()
+    used_selectors, stale = warm_selector_cache(cfgs)
+    if stale:
+        save_selector_cache(used_selectors)
+    t0 = _lap(timings, "configs", t0)
+
+    # fetch every site concurrently, parse them in parallel worker processes,
+    # then write feeds sequentially from the main process
+    htmls = asyncio.run(gather_all(jobs))
+    t0 = _lap(timings, "fetch", t0)
+    with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as executor:
+        results = list(executor.map(_parse_site_timed, htmls, cfgs, fnames))
+    t0 = _lap(timings, "parse_pool", t0)
+    # every feed written in this run shares one timestamp
+    pub_date = format_datetime(datetime.now(timezone.utc))
+    for cfg, (site_name, entries, site_timings) in zip(cfgs, results):
+        for stage, secs in site_timings.items():
+            timings[stage] = timings.get(stage, 0.0) + secs
+        build_and_write_feed(site_name, cfg, entries, pub_date)
+    _lap(timings, "write", t0)
+    print_timings(timings)
 
 if __name__ == "__main__":
     main()